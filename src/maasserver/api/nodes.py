@@ -819,16 +819,22 @@ class NodesHandler(OperationsHandler):
                 RegionControllersHandler,
             )
 
-            racks = RackControllersHandler().read(request).order_by("id")
+            # Each handler returns an evaluated queryset, already ordered by
+            # id and with its related objects prefetched. Cloning it (with
+            # order_by() or exclude(), say) would throw all of that away and
+            # issue every query again, so filter in Python instead.
+            racks = RackControllersHandler().read(request)
+            rack_ids = {rack.id for rack in racks}
             nodes = list(
                 chain(
-                    DevicesHandler().read(request).order_by("id"),
-                    MachinesHandler().read(request).order_by("id"),
+                    DevicesHandler().read(request),
+                    MachinesHandler().read(request),
                     racks,
-                    RegionControllersHandler()
-                    .read(request)
-                    .exclude(id__in=racks)
-                    .order_by("id"),
+                    (
+                        region
+                        for region in RegionControllersHandler().read(request)
+                        if region.id not in rack_ids
+                    ),
                 )
             )
             return nodes
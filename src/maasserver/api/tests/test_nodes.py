@@ -6,14 +6,19 @@
 __all__ = []
 
 import http.client
-import json
+from operator import attrgetter, itemgetter
 import random
 
 from django.conf import settings
 from django.http import QueryDict
 
+from maasserver import middleware
 from maasserver.api import auth
 from maasserver.api import nodes as nodes_module
+from maasserver.api.devices import DevicesHandler
+from maasserver.api.machines import MachinesHandler
+from maasserver.api.rackcontrollers import RackControllersHandler
+from maasserver.api.regioncontrollers import RegionControllersHandler
 from maasserver.api.utils import get_overridden_query_dict
 from maasserver.enum import (
     INTERFACE_TYPE,
@@ -23,12 +28,16 @@ from maasserver.enum import (
     NODE_TYPE_CHOICES,
 )
 from maasserver.exceptions import MAASAPIValidationError
+from maasserver.models import Node
 from maasserver.testing.api import APITestCase
 from maasserver.testing.factory import factory
 from maasserver.testing.fixtures import RBACEnabled
+from maasserver.testing.testcase import MAASServerTestCase
 from maasserver.utils import ignore_unused
+from maasserver.utils.converters import json_load_bytes
 from maasserver.utils.django_urls import reverse
 from maasserver.utils.orm import reload_object
+from maastesting.djangotestcase import count_queries
 
 
 class TestIsRegisteredAnonAPI(APITestCase.ForAnonymousAndUserAndAdmin):
@@ -176,13 +185,22 @@ class TestIsActionInProgressAPI(APITestCase.ForAnonymous):
         )
 
 
+def make_nodes(count):
+    """Make `count` nodes for the listing tests.
+
+    Listing doesn't care about storage, so this skips making a boot disk for
+    each node, which saves several inserts per node.
+    """
+    return factory.make_Nodes(count, with_boot_disk=False)
+
+
 def extract_system_ids(parsed_result):
     """List the system_ids of the nodes in `parsed_result`."""
-    return [node.get("system_id") for node in parsed_result]
+    return list(map(itemgetter("system_id"), parsed_result))
 
 
 def extract_system_ids_from_nodes(nodes):
-    return [node.system_id for node in nodes]
+    return list(map(attrgetter("system_id"), nodes))
 
 
 class RequestFixture:
@@ -193,11 +211,17 @@ class RequestFixture:
         self.GET = get_overridden_query_dict(dict, QueryDict(""), fields)
 
 
-class TestFilteredNodesListFromRequest(APITestCase.ForUser):
+class TestFilteredNodesListFromRequest(MAASServerTestCase):
+    """Tests for `filtered_nodes_list_from_request`.
+
+    These call the function directly, so there's no need to replay them for
+    every API user and client scenario as `APITestCase` would.
+    """
+
     def test_node_list_with_id_returns_matching_nodes(self):
         # The "list" operation takes optional "id" parameters.  Only
         # nodes with matching ids will be returned.
-        ids = [factory.make_Node().system_id for _ in range(3)]
+        ids = [node.system_id for node in make_nodes(3)]
         matching_id = ids[0]
         query = RequestFixture({"id": [matching_id]}, "id")
         node_list = nodes_module.filtered_nodes_list_from_request(query)
@@ -219,7 +243,7 @@ class TestFilteredNodesListFromRequest(APITestCase.ForUser):
     def test_node_list_with_ids_orders_by_id(self):
         # Even when ids are passed to "list," nodes are returned in id
         # order, not necessarily in the order of the id arguments.
-        all_nodes = [factory.make_Node() for _ in range(3)]
+        all_nodes = make_nodes(3)
         system_ids = [node.system_id for node in all_nodes]
         random.shuffle(system_ids)
 
@@ -250,7 +274,7 @@ class TestFilteredNodesListFromRequest(APITestCase.ForUser):
     def test_node_list_with_hostname_returns_matching_nodes(self):
         # The list operation takes optional "hostname" parameters. Only nodes
         # with matching hostnames will be returned.
-        nodes = [factory.make_Node() for _ in range(3)]
+        nodes = make_nodes(3)
         matching_hostname = nodes[0].hostname
         matching_system_id = nodes[0].system_id
 
@@ -390,7 +414,7 @@ class TestFilteredNodesListFromRequest(APITestCase.ForUser):
         node1 = factory.make_Node(pool=pool1)
         factory.make_Node(pool=pool2)
 
-        query = RequestFixture({"pool": pool1.name}, "pool", self.user)
+        query = RequestFixture({"pool": pool1.name}, "pool")
         node_list = nodes_module.filtered_nodes_list_from_request(query)
 
         self.assertSequenceEqual(
@@ -403,7 +427,7 @@ class TestFilteredNodesListFromRequest(APITestCase.ForUser):
             for _ in range(3)
         ]
 
-        query = RequestFixture({}, "", self.user)
+        query = RequestFixture({}, "")
         node_list = nodes_module.filtered_nodes_list_from_request(query)
 
         self.assertSequenceEqual(
@@ -415,8 +439,38 @@ class TestFilteredNodesListFromRequest(APITestCase.ForUser):
 class TestNodesAPI(APITestCase.ForUser):
     """Tests for /api/2.0/nodes/."""
 
+    def setUp(self):
+        super(TestNodesAPI, self).setUp()
+        self.nodes_uri = reverse("nodes_handler")
+
+    def assertSameIds(self, expected, observed, msg=None):
+        """Check that `observed` lists the same system_ids as `expected`.
+
+        Order doesn't matter but duplicates do. Sorting plain lists of ids is
+        cheaper than `assertItemsEqual` and its mapping guard.
+        """
+        self.assertEqual(sorted(expected), sorted(observed), msg)
+
+    def get_nodes_within_query_budget(self, params):
+        """GET the nodes listing filtered by `params`.
+
+        The query budget is the cost of listing every node: a filter may only
+        narrow the listing, never add queries of its own.
+        """
+        # Patch middleware so it does not affect query counting.
+        self.patch(
+            middleware.ExternalComponentsMiddleware,
+            "_check_rack_controller_connectivity",
+        )
+        budget, _ = count_queries(self.client.get, self.nodes_uri)
+        num_queries, response = count_queries(
+            self.client.get, self.nodes_uri, params
+        )
+        self.assertLessEqual(num_queries, budget)
+        return response
+
     def test_handler_path(self):
-        self.assertEqual("/MAAS/api/2.0/nodes/", reverse("nodes_handler"))
+        self.assertEqual("/MAAS/api/2.0/nodes/", self.nodes_uri)
 
     def test_GET_lists_nodes(self):
         # The api allows for fetching the list of Nodes.
@@ -424,16 +478,80 @@ class TestNodesAPI(APITestCase.ForUser):
         node2 = factory.make_Node(
             status=NODE_STATUS.ALLOCATED, owner=self.user
         )
-        response = self.client.get(reverse("nodes_handler"))
-        parsed_result = json.loads(
-            response.content.decode(settings.DEFAULT_CHARSET)
-        )
+        response = self.client.get(self.nodes_uri)
+        parsed_result = json_load_bytes(response.content)
         self.assertEqual(http.client.OK, response.status_code)
-        self.assertItemsEqual(
+        self.assertSameIds(
             [node1.system_id, node2.system_id],
             extract_system_ids(parsed_result),
         )
 
+    def test_GET_does_not_repeat_queries_of_each_node_type(self):
+        # Listing all nodes costs no more queries than listing each type of
+        # node separately; the per-type results are not evaluated twice.
+        factory.make_Node()
+        factory.make_Device(owner=self.user)
+        factory.make_RackController()
+        factory.make_RegionController()
+        request = RequestFixture({}, "", self.user)
+        # Warm up anything that is cached after the first request.
+        nodes_module.NodesHandler().read(request)
+        expected_num_queries = sum(
+            count_queries(handler.read, request)[0]
+            for handler in (
+                DevicesHandler(),
+                MachinesHandler(),
+                RackControllersHandler(),
+                RegionControllersHandler(),
+            )
+        )
+        num_queries, _ = count_queries(
+            nodes_module.NodesHandler().read, request
+        )
+        self.assertEqual(expected_num_queries, num_queries)
+
+    def test_GET_adds_no_per_node_queries_to_machine_listing(self):
+        # An N+1 probe for the combined listing: each additional machine
+        # costs the same number of queries whether it is listed through
+        # nodes_handler or through machines_handler.
+        # Patch middleware so it does not affect query counting.
+        self.patch(
+            middleware.ExternalComponentsMiddleware,
+            "_check_rack_controller_connectivity",
+        )
+
+        def make_machines():
+            for _ in range(3):
+                node = factory.make_Node_with_Interface_on_Subnet()
+                factory.make_VirtualBlockDevice(node=node)
+            # XXX ltrager 2019-08-16 - Work around for LP:1840491
+            Node.objects.update(boot_disk=None)
+
+        def count_listing_queries(num_machines):
+            counts = []
+            for handler in ("nodes_handler", "machines_handler"):
+                num_queries, response = count_queries(
+                    self.client.get, reverse(handler)
+                )
+                # It's not useful to compare the number of queries if the
+                # responses are not ok, so check each one as it's counted.
+                parsed_result = json_load_bytes(response.content)
+                self.assertEqual(
+                    (http.client.OK, num_machines),
+                    (response.status_code, len(parsed_result)),
+                )
+                counts.append(num_queries)
+            return counts
+
+        make_machines()
+        nodes_queries1, machines_queries1 = count_listing_queries(3)
+        make_machines()
+        nodes_queries2, machines_queries2 = count_listing_queries(6)
+        self.assertEqual(
+            machines_queries2 - machines_queries1,
+            nodes_queries2 - nodes_queries1,
+        )
+
     def test_GET_lists_nodes_admin(self):
         # Only admins can see controllers
         self.become_admin()
@@ -443,28 +561,22 @@ class TestNodesAPI(APITestCase.ForUser):
             ).system_id
             for node_type in NODE_TYPE_CHOICES
         ]
-        response = self.client.get(reverse("nodes_handler"))
-        parsed_result = json.loads(
-            response.content.decode(settings.DEFAULT_CHARSET)
-        )
+        response = self.client.get(self.nodes_uri)
+        parsed_result = json_load_bytes(response.content)
         self.assertEqual(http.client.OK, response.status_code)
-        self.assertItemsEqual(system_ids, extract_system_ids(parsed_result))
+        self.assertSameIds(system_ids, extract_system_ids(parsed_result))
 
     def test_GET_without_nodes_returns_empty_list(self):
         # If there are no nodes to list, the "list" op still works but
         # returns an empty list.
-        response = self.client.get(reverse("nodes_handler"))
-        self.assertItemsEqual(
-            [], json.loads(response.content.decode(settings.DEFAULT_CHARSET))
-        )
+        response = self.client.get(self.nodes_uri)
+        self.assertEqual([], json_load_bytes(response.content))
 
     def test_GET_orders_by_id(self):
         # Nodes are returned in id order.
-        nodes = [factory.make_Node() for counter in range(3)]
-        response = self.client.get(reverse("nodes_handler"))
-        parsed_result = json.loads(
-            response.content.decode(settings.DEFAULT_CHARSET)
-        )
+        nodes = make_nodes(3)
+        response = self.client.get(self.nodes_uri)
+        parsed_result = json_load_bytes(response.content)
         self.assertSequenceEqual(
             [node.system_id for node in nodes],
             extract_system_ids(parsed_result),
@@ -473,38 +585,26 @@ class TestNodesAPI(APITestCase.ForUser):
     def test_GET_with_id_returns_matching_nodes(self):
         # The "list" operation takes optional "id" parameters.  Only
         # nodes with matching ids will be returned.
-        ids = [factory.make_Node().system_id for counter in range(3)]
+        ids = [node.system_id for node in make_nodes(3)]
         matching_id = ids[0]
-        response = self.client.get(
-            reverse("nodes_handler"), {"id": [matching_id]}
-        )
-        parsed_result = json.loads(
-            response.content.decode(settings.DEFAULT_CHARSET)
-        )
-        self.assertItemsEqual([matching_id], extract_system_ids(parsed_result))
+        response = self.get_nodes_within_query_budget({"id": [matching_id]})
+        parsed_result = json_load_bytes(response.content)
+        self.assertSameIds([matching_id], extract_system_ids(parsed_result))
 
     def test_GET_list_with_nonexistent_id_returns_empty_list(self):
         # Trying to list a nonexistent node id returns a list containing
         # no nodes -- even if other (non-matching) nodes exist.
         existing_id = factory.make_Node().system_id
         nonexistent_id = existing_id + factory.make_string()
-        response = self.client.get(
-            reverse("nodes_handler"), {"id": [nonexistent_id]}
-        )
-        self.assertItemsEqual(
-            [], json.loads(response.content.decode(settings.DEFAULT_CHARSET))
-        )
+        response = self.client.get(self.nodes_uri, {"id": [nonexistent_id]})
+        self.assertEqual([], json_load_bytes(response.content))
 
     def test_GET_with_ids_orders_by_id(self):
         # Even when ids are passed to "list," nodes are returned in id
         # order, not necessarily in the order of the id arguments.
-        ids = [factory.make_Node().system_id for counter in range(3)]
-        response = self.client.get(
-            reverse("nodes_handler"), {"id": list(reversed(ids))}
-        )
-        parsed_result = json.loads(
-            response.content.decode(settings.DEFAULT_CHARSET)
-        )
+        ids = [node.system_id for node in make_nodes(3)]
+        response = self.client.get(self.nodes_uri, {"id": list(reversed(ids))})
+        parsed_result = json_load_bytes(response.content)
         self.assertSequenceEqual(ids, extract_system_ids(parsed_result))
 
     def test_GET_with_some_matching_ids_returns_matching_nodes(self):
@@ -513,26 +613,22 @@ class TestNodesAPI(APITestCase.ForUser):
         existing_id = factory.make_Node().system_id
         nonexistent_id = existing_id + factory.make_string()
         response = self.client.get(
-            reverse("nodes_handler"), {"id": [existing_id, nonexistent_id]}
-        )
-        parsed_result = json.loads(
-            response.content.decode(settings.DEFAULT_CHARSET)
+            self.nodes_uri, {"id": [existing_id, nonexistent_id]}
         )
-        self.assertItemsEqual([existing_id], extract_system_ids(parsed_result))
+        parsed_result = json_load_bytes(response.content)
+        self.assertSameIds([existing_id], extract_system_ids(parsed_result))
 
     def test_GET_with_hostname_returns_matching_nodes(self):
         # The list operation takes optional "hostname" parameters. Only nodes
         # with matching hostnames will be returned.
-        nodes = [factory.make_Node() for _ in range(3)]
+        nodes = make_nodes(3)
         matching_hostname = nodes[0].hostname
         matching_system_id = nodes[0].system_id
-        response = self.client.get(
-            reverse("nodes_handler"), {"hostname": [matching_hostname]}
-        )
-        parsed_result = json.loads(
-            response.content.decode(settings.DEFAULT_CHARSET)
+        response = self.get_nodes_within_query_budget(
+            {"hostname": [matching_hostname]}
         )
-        self.assertItemsEqual(
+        parsed_result = json_load_bytes(response.content)
+        self.assertSameIds(
             [matching_system_id], extract_system_ids(parsed_result)
         )
 
@@ -544,13 +640,11 @@ class TestNodesAPI(APITestCase.ForUser):
         ]
         matching_mac = interfaces[0].mac_address
         matching_system_id = interfaces[0].node.system_id
-        response = self.client.get(
-            reverse("nodes_handler"), {"mac_address": [matching_mac]}
-        )
-        parsed_result = json.loads(
-            response.content.decode(settings.DEFAULT_CHARSET)
+        response = self.get_nodes_within_query_budget(
+            {"mac_address": [matching_mac]}
         )
-        self.assertItemsEqual(
+        parsed_result = json_load_bytes(response.content)
+        self.assertSameIds(
             [matching_system_id], extract_system_ids(parsed_result)
         )
 
@@ -564,13 +658,10 @@ class TestNodesAPI(APITestCase.ForUser):
             factory.make_Interface(INTERFACE_TYPE.PHYSICAL).mac_address
         )
         response = self.client.get(
-            reverse("nodes_handler"),
-            {"mac_address": [bad_mac1, bad_mac2, ok_mac]},
+            self.nodes_uri, {"mac_address": [bad_mac1, bad_mac2, ok_mac]},
         )
         self.assertEqual(http.client.BAD_REQUEST, response.status_code)
-        parsed_result = json.loads(
-            response.content.decode(settings.DEFAULT_CHARSET)
-        )
+        parsed_result = json_load_bytes(response.content)
         self.assertEqual(
             parsed_result,
             {
@@ -587,13 +678,11 @@ class TestNodesAPI(APITestCase.ForUser):
         ignore_unused(non_listed_node)
         agent_name = factory.make_name("agent-name")
         node = factory.make_Node(agent_name=agent_name)
-        response = self.client.get(
-            reverse("nodes_handler"), {"agent_name": agent_name}
+        response = self.get_nodes_within_query_budget(
+            {"agent_name": agent_name}
         )
         self.assertEqual(http.client.OK, response.status_code)
-        parsed_result = json.loads(
-            response.content.decode(settings.DEFAULT_CHARSET)
-        )
+        parsed_result = json_load_bytes(response.content)
         self.assertSequenceEqual(
             [node.system_id], extract_system_ids(parsed_result)
         )
@@ -601,13 +690,9 @@ class TestNodesAPI(APITestCase.ForUser):
     def test_GET_with_agent_name_filters_with_empty_string(self):
         factory.make_Node(agent_name=factory.make_name("agent-name"))
         node = factory.make_Node(agent_name="")
-        response = self.client.get(
-            reverse("nodes_handler"), {"agent_name": ""}
-        )
+        response = self.client.get(self.nodes_uri, {"agent_name": ""})
         self.assertEqual(http.client.OK, response.status_code)
-        parsed_result = json.loads(
-            response.content.decode(settings.DEFAULT_CHARSET)
-        )
+        parsed_result = json_load_bytes(response.content)
         self.assertSequenceEqual(
             [node.system_id], extract_system_ids(parsed_result)
         )
@@ -617,11 +702,9 @@ class TestNodesAPI(APITestCase.ForUser):
             factory.make_Node(agent_name=factory.make_name("agent-name"))
             for _ in range(3)
         ]
-        response = self.client.get(reverse("nodes_handler"))
+        response = self.client.get(self.nodes_uri)
         self.assertEqual(http.client.OK, response.status_code)
-        parsed_result = json.loads(
-            response.content.decode(settings.DEFAULT_CHARSET)
-        )
+        parsed_result = json_load_bytes(response.content)
         self.assertSequenceEqual(
             [node.system_id for node in nodes],
             extract_system_ids(parsed_result),
@@ -631,10 +714,8 @@ class TestNodesAPI(APITestCase.ForUser):
         # The api allows for fetching the list of Nodes.
         factory.make_Node()
         factory.make_Node(status=NODE_STATUS.ALLOCATED, owner=self.user)
-        response = self.client.get(reverse("nodes_handler"))
-        parsed_result = json.loads(
-            response.content.decode(settings.DEFAULT_CHARSET)
-        )
+        response = self.client.get(self.nodes_uri)
+        parsed_result = json_load_bytes(response.content)
         self.assertEqual(http.client.OK, response.status_code)
         disable_ipv4 = [node.get("disable_ipv4") for node in parsed_result]
         self.assertItemsEqual([False, False], disable_ipv4)
@@ -653,12 +734,10 @@ class TestNodesAPI(APITestCase.ForUser):
             factory.make_Node(agent_name=factory.make_name("agent-name"))
             for _ in range(3)
         ]
-        response = self.client.get(reverse("nodes_handler"))
+        response = self.client.get(self.nodes_uri)
         self.assertEqual(http.client.OK, response.status_code)
-        parsed_result = json.loads(
-            response.content.decode(settings.DEFAULT_CHARSET)
-        )
-        self.assertItemsEqual(
+        parsed_result = json_load_bytes(response.content)
+        self.assertSameIds(
             [node.system_id for node in machines + devices + rack_controllers],
             extract_system_ids(parsed_result),
             "Node listing doesn't contain all node types.",
@@ -671,24 +750,18 @@ class TestNodesAPI(APITestCase.ForUser):
         ignore_unused(non_listed_node)
         zone = factory.make_Zone()
         node = factory.make_Node(zone=zone)
-        response = self.client.get(
-            reverse("nodes_handler"), {"zone": zone.name}
-        )
+        response = self.get_nodes_within_query_budget({"zone": zone.name})
         self.assertEqual(http.client.OK, response.status_code)
-        parsed_result = json.loads(
-            response.content.decode(settings.DEFAULT_CHARSET)
-        )
+        parsed_result = json_load_bytes(response.content)
         self.assertSequenceEqual(
             [node.system_id], extract_system_ids(parsed_result)
         )
 
     def test_GET_without_zone_does_not_filter(self):
         nodes = [factory.make_Node(zone=factory.make_Zone()) for _ in range(3)]
-        response = self.client.get(reverse("nodes_handler"))
+        response = self.client.get(self.nodes_uri)
         self.assertEqual(http.client.OK, response.status_code)
-        parsed_result = json.loads(
-            response.content.decode(settings.DEFAULT_CHARSET)
-        )
+        parsed_result = json_load_bytes(response.content)
         self.assertSequenceEqual(
             [node.system_id for node in nodes],
             extract_system_ids(parsed_result),
@@ -699,7 +772,7 @@ class TestNodesAPI(APITestCase.ForUser):
         node = factory.make_Node()
         zone = factory.make_Zone()
         response = self.client.post(
-            reverse("nodes_handler"),
+            self.nodes_uri,
             {"op": "set_zone", "nodes": [node.system_id], "zone": zone.name},
         )
         self.assertEqual(http.client.OK, response.status_code)
@@ -711,7 +784,7 @@ class TestNodesAPI(APITestCase.ForUser):
         node = factory.make_Node()
         original_zone = node.zone
         response = self.client.post(
-            reverse("nodes_handler"),
+            self.nodes_uri,
             {
                 "op": "set_zone",
                 "nodes": [factory.make_Node().system_id],
@@ -726,7 +799,7 @@ class TestNodesAPI(APITestCase.ForUser):
         node = factory.make_Node(owner=self.user)
         original_zone = node.zone
         response = self.client.post(
-            reverse("nodes_handler"),
+            self.nodes_uri,
             {
                 "op": "set_zone",
                 "nodes": [node.system_id],
@@ -747,7 +820,7 @@ class TestNodesAPI(APITestCase.ForUser):
         rbac.store.allow(self.user.username, machine.pool, "admin-machines")
         rbac.store.allow(self.user.username, machine.pool, "view")
         response = self.client.post(
-            reverse("nodes_handler"),
+            self.nodes_uri,
             {
                 "op": "set_zone",
                 "nodes": [machine.system_id],
@@ -759,15 +832,15 @@ class TestNodesAPI(APITestCase.ForUser):
         self.assertEqual(zone, machine.zone)
 
     def test_CREATE_disabled(self):
-        response = self.client.post(reverse("nodes_handler"), {})
+        response = self.client.post(self.nodes_uri, {})
         self.assertEqual(http.client.BAD_REQUEST, response.status_code)
 
     def test_UPDATE_disabled(self):
-        response = self.client.put(reverse("nodes_handler"), {})
+        response = self.client.put(self.nodes_uri, {})
         self.assertEqual(http.client.METHOD_NOT_ALLOWED, response.status_code)
 
     def test_DELETE_disabled(self):
-        response = self.client.put(reverse("nodes_handler"), {})
+        response = self.client.put(self.nodes_uri, {})
         self.assertEqual(http.client.METHOD_NOT_ALLOWED, response.status_code)
 
 
@@ -780,6 +853,28 @@ class TestPowersMixin(APITestCase.ForUser):
         # power commands
         return reverse("machine_handler", args=[node.system_id])
 
+    def make_machines_with_power_parameters(self, count):
+        """Make `count` machines, each with its own random power parameter.
+
+        :return: A dict mapping each machine's system_id to its power
+            parameters, as the `power_parameters` operation reports them.
+        """
+        # Power parameters need neither a boot disk nor a zone per machine.
+        zone = factory.make_Zone()
+        machines = (
+            factory.make_Node(
+                zone=zone,
+                with_boot_disk=False,
+                power_parameters={
+                    factory.make_string(): factory.make_string()
+                },
+            )
+            for _ in range(count)
+        )
+        return {
+            machine.system_id: machine.power_parameters for machine in machines
+        }
+
     def test_GET_power_parameters_requires_admin(self):
         response = self.client.get(
             reverse("machines_handler"), {"op": "power_parameters"}
@@ -790,46 +885,29 @@ class TestPowersMixin(APITestCase.ForUser):
 
     def test_GET_power_parameters_without_ids_does_not_filter(self):
         self.become_admin()
-        machines = [
-            factory.make_Node(
-                power_parameters={factory.make_string(): factory.make_string()}
-            )
-            for _ in range(0, 3)
-        ]
+        expected = self.make_machines_with_power_parameters(3)
         response = self.client.get(
             reverse("machines_handler"), {"op": "power_parameters"}
         )
         self.assertEqual(
             http.client.OK, response.status_code, response.content
         )
-        parsed = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
-        expected = {
-            machine.system_id: machine.power_parameters for machine in machines
-        }
+        parsed = json_load_bytes(response.content)
         self.assertEqual(expected, parsed)
 
     def test_GET_power_parameters_with_ids_filters(self):
         self.become_admin()
-        machines = [
-            factory.make_Node(
-                power_parameters={factory.make_string(): factory.make_string()}
-            )
-            for _ in range(0, 6)
-        ]
-        expected_machines = random.sample(machines, 3)
+        machines = self.make_machines_with_power_parameters(6)
+        expected_ids = random.sample(sorted(machines), 3)
         response = self.client.get(
             reverse("machines_handler"),
-            {
-                "op": "power_parameters",
-                "id": [machine.system_id for machine in expected_machines],
-            },
+            {"op": "power_parameters", "id": expected_ids},
         )
         self.assertEqual(
             http.client.OK, response.status_code, response.content
         )
-        parsed = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
+        parsed = json_load_bytes(response.content)
         expected = {
-            machine.system_id: machine.power_parameters
-            for machine in expected_machines
+            system_id: machines[system_id] for system_id in expected_ids
         }
         self.assertEqual(expected, parsed)
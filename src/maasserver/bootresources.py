@@ -15,7 +15,7 @@ __all__ = [
 ]
 
 from datetime import timedelta
-from operator import itemgetter
+from operator import attrgetter, itemgetter
 import os
 from subprocess import CalledProcessError
 from textwrap import dedent
@@ -23,6 +23,7 @@ import threading
 import time
 
 from django.db import connection, connections
+from django.db.models import Count, Prefetch, Sum
 from django.db.utils import load_backend
 from django.http import HttpResponse, StreamingHttpResponse
 from pkg_resources import parse_version
@@ -213,8 +214,24 @@ class SimpleStreamsHandler:
         )
 
     def gen_complete_boot_resources(self):
-        """Return generator of `BootResource` that contains a complete set."""
-        resources = BootResource.objects.all()
+        """Return generator of `BootResource` that contains a complete set.
+
+        Each resource comes with its sets, their files and large files
+        prefetched, and each set is annotated with the file counts and sizes
+        that `BootResource.get_latest_complete_set` looks for.
+        """
+        files_prefetch = BootResourceFile.objects.select_related("largefile")
+        sets_prefetch = BootResourceSet.objects.annotate(
+            files_count=Count("files__id"),
+            files_size=Sum("files__largefile__size"),
+            files_total_size=Sum("files__largefile__total_size"),
+        )
+        sets_prefetch = sets_prefetch.prefetch_related(
+            Prefetch("files", files_prefetch)
+        )
+        resources = BootResource.objects.prefetch_related(
+            Prefetch("sets", sets_prefetch)
+        )
         for resource in resources:
             # Only add resources that have a complete set.
             if resource.get_latest_complete_set() is None:
@@ -273,14 +290,26 @@ class SimpleStreamsHandler:
         return item
 
     def get_product_data(self, resource):
-        """Returns the product data for this resource."""
+        """Returns the product data for this resource.
+
+        :param resource: A `BootResource` from `gen_complete_boot_resources`,
+            which prefetches what is needed here.
+        """
         os, arch, subarch, series = self.get_boot_resource_identifiers(
             resource
         )
         versions = {}
         label = None
-        for resource_set in resource.sets.order_by("id").reverse():
-            if not resource_set.complete:
+        resource_sets = sorted(
+            resource.sets.all(), key=attrgetter("id"), reverse=True
+        )
+        for resource_set in resource_sets:
+            # The same test as `BootResourceSet.complete`, but against the
+            # annotations rather than with two queries per set.
+            if (
+                resource_set.files_count == 0
+                or resource_set.files_size != resource_set.files_total_size
+            ):
                 continue
             # Set the label to the latest complete set label. In most cases the
             # label will be the same for all sets. Only time it will differ is
@@ -440,12 +469,18 @@ class BootResourceStore(ObjectStore):
         Each resource that is being updated will be removed from the list. The
         remaining at the end of the sync will be removed.
         """
-        self._resources_to_delete = {
-            self.get_resource_identity(resource)
-            for resource in BootResource.objects.filter(
-                rtype=BOOT_RESOURCE_TYPE.SYNCED
+        # Only the name and architecture are needed to build each identity,
+        # so don't load whole `BootResource` objects.
+        synced_resources = BootResource.objects.filter(
+            rtype=BOOT_RESOURCE_TYPE.SYNCED
+        ).values_list("name", "architecture")
+        self._resources_to_delete = set()
+        for name, architecture in synced_resources:
+            os, series = name.split("/")
+            arch, subarch = architecture.split("/")
+            self._resources_to_delete.add(
+                "%s/%s/%s/%s" % (os, arch, subarch, series)
             )
-        }
 
         # XXX blake_r 2014-10-30 bug=1387133: We store a copy of the resources
         # to delete, so we can check if all the same resources will be delete
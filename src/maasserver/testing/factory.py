@@ -596,6 +596,18 @@ class Factory(maastesting.factory.Factory):
             Node.objects.filter(id=node.id).update(created=created)
         return reload_object(node)
 
+    def make_Nodes(self, count, **kwargs):
+        """Make `count` nodes that share a zone.
+
+        `make_Node` creates a new zone for every node unless told otherwise,
+        which tests that just need a handful of nodes seldom care about. This
+        makes one zone for the whole batch; all other arguments are passed
+        through to `make_Node`.
+        """
+        if kwargs.get("zone") is None:
+            kwargs["zone"] = self.make_Zone()
+        return [self.make_Node(**kwargs) for _ in range(count)]
+
     def make_Machine(self, *args, **kwargs):
         machine = self.make_Node(*args, node_type=NODE_TYPE.MACHINE, **kwargs)
         return machine.as_machine()
@@ -1939,6 +1951,23 @@ class Factory(maastesting.factory.Factory):
             tag._populate_nodes_now()
         return tag
 
+    def make_Tags(self, names, definition="//node"):
+        """Make a tag for each of `names` with a single INSERT.
+
+        Unlike `make_Tag` this never populates nodes; attach the tags to
+        nodes explicitly, e.g. with `node.tags.set(tags)`.
+        """
+        created = timezone.now()
+        return Tag.objects.bulk_create(
+            Tag(
+                name=name,
+                definition=definition,
+                created=created,
+                updated=created,
+            )
+            for name in names
+        )
+
     def make_user_with_keys(
         self, n_keys=2, user=None, keysource=None, **kwargs
     ):
@@ -2238,7 +2267,7 @@ class Factory(maastesting.factory.Factory):
         )
 
     @typed
-    def make_LargeFile(self, content: bytes = None, size=512):
+    def make_LargeFile(self, content: bytes = None, size=512, sha256=None):
         """Create `LargeFile`.
 
         :param content: Data to store in large file object.
@@ -2246,12 +2275,15 @@ class Factory(maastesting.factory.Factory):
             then it will be a random string of this size. If content is
             provided and `size` is not the same length, then it will
             be an inprogress file.
+        :param sha256: Checksum of the complete file. Defaults to the
+            checksum of `content`.
         """
         if content is None:
             content = factory.make_bytes(size=size)
-        sha256 = hashlib.sha256()
-        sha256.update(content)
-        sha256 = sha256.hexdigest()
+        if sha256 is None:
+            sha256 = hashlib.sha256()
+            sha256.update(content)
+            sha256 = sha256.hexdigest()
         largeobject = LargeObjectFile()
         with largeobject.open("wb") as stream:
             stream.write(content)
@@ -2362,7 +2394,13 @@ class Factory(maastesting.factory.Factory):
         bootloader_type=None,
         rolling=False,
         filename=None,
+        largefile=None,
     ):
+        """Make a boot resource with a complete set of files.
+
+        :param largefile: A `LargeFile` for all of the set's files to share.
+            By default each file gets its own, with random content.
+        """
         resource = self.make_BootResource(
             rtype=rtype,
             name=name,
@@ -2392,13 +2430,22 @@ class Factory(maastesting.factory.Factory):
             # We set the filename to the same value as filetype, as in most
             # cases this will always be true. The simplestreams content from
             # maas.io, is formatted this way.
-            self.make_boot_resource_file_with_content(
-                resource_set,
-                filename=filename,
-                filetype=filetype,
-                size=None,
-                extra=extra,
-            )
+            if largefile is None:
+                self.make_boot_resource_file_with_content(
+                    resource_set,
+                    filename=filename,
+                    filetype=filetype,
+                    size=None,
+                    extra=extra,
+                )
+            else:
+                self.make_BootResourceFile(
+                    resource_set,
+                    largefile,
+                    filename=filename,
+                    filetype=filetype,
+                    extra=extra,
+                )
         return resource
 
     def make_incomplete_boot_resource(
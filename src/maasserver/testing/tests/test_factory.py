@@ -9,6 +9,7 @@ import random
 
 from testtools.matchers import Contains, ContainsDict, Equals
 
+from maasserver.models import Tag
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
 from maasserver.utils.orm import reload_object
@@ -113,3 +114,44 @@ class TestFactoryForNodes(MAASServerTestCase):
             node.get_effective_power_parameters(),
             ContainsDict({p_key: Equals(p_value)}),
         )
+
+    def test_make_Nodes_makes_count_nodes_in_one_zone(self):
+        nodes = factory.make_Nodes(3)
+        self.assertEqual(3, len({node.id for node in nodes}))
+        self.assertEqual(1, len({node.zone_id for node in nodes}))
+
+    def test_make_Nodes_passes_arguments_to_make_Node(self):
+        zone = factory.make_Zone()
+        nodes = factory.make_Nodes(2, zone=zone, with_boot_disk=False)
+        self.assertEqual(
+            [(zone, None), (zone, None)],
+            [(node.zone, node.boot_disk) for node in nodes],
+        )
+
+
+class TestFactoryForTags(MAASServerTestCase):
+    def test_make_Tags_makes_a_tag_per_name(self):
+        names = [factory.make_name("tag") for _ in range(3)]
+        tags = factory.make_Tags(names)
+        self.assertItemsEqual(
+            names,
+            Tag.objects.filter(id__in=[tag.id for tag in tags]).values_list(
+                "name", flat=True
+            ),
+        )
+
+    def test_make_Tags_does_not_populate_nodes(self):
+        node = factory.make_Node()
+        factory.make_Tags([factory.make_name("tag")])
+        self.assertItemsEqual([], node.tags.all())
+
+
+class TestFactoryForBootResources(MAASServerTestCase):
+    def test_make_usable_boot_resource_can_share_a_largefile(self):
+        largefile = factory.make_LargeFile()
+        resource = factory.make_usable_boot_resource(largefile=largefile)
+        resource_set = resource.get_latest_complete_set()
+        self.assertEqual(
+            {largefile.id},
+            {rfile.largefile_id for rfile in resource_set.files.all()},
+        )
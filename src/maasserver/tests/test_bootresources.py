@@ -7,9 +7,9 @@ __all__ = []
 
 from datetime import datetime
 from email.utils import format_datetime
+import hashlib
 import http.client
 from io import BytesIO
-import json
 import logging
 import os
 from os import environ
@@ -30,7 +30,7 @@ from twisted.application.internet import TimerService
 from twisted.internet.defer import Deferred, fail, inlineCallbacks, succeed
 from twisted.protocols.amp import UnhandledCommand
 
-from maasserver import __version__, bootresources
+from maasserver import __version__, bootresources, middleware
 from maasserver.bootresources import (
     BootResourceRepoWriter,
     BootResourceStore,
@@ -74,8 +74,8 @@ from maasserver.testing.testcase import (
     MAASServerTestCase,
     MAASTransactionServerTestCase,
 )
-from maasserver.testing.testclient import MAASSensibleClient
 from maasserver.utils import absolute_reverse, get_maas_user_agent
+from maasserver.utils.converters import json_load_bytes
 from maasserver.utils.django_urls import reverse
 from maasserver.utils.orm import (
     get_one,
@@ -84,6 +84,7 @@ from maasserver.utils.orm import (
     transactional,
 )
 from maasserver.utils.threads import deferToDatabase
+from maastesting.djangotestcase import count_queries
 from maastesting.matchers import (
     MockCalledOnce,
     MockCalledOnceWith,
@@ -101,15 +102,33 @@ from provisioningserver.utils.twisted import asynchronous, DeferredValue
 wait_for_reactor = wait_for(30)  # 30 seconds.
 
 
+def get_first_resource_file(resource):
+    """Return the first file in the first set of `resource`.
+
+    This is `resource.sets.first().files.first()` in a single query, with
+    the file's `LargeFile` selected too.
+    """
+    return (
+        BootResourceFile.objects.select_related("largefile")
+        .filter(resource_set__resource=resource)
+        .order_by("resource_set_id", "id")
+        .first()
+    )
+
+
 def make_boot_resource_file_with_stream(size=None):
+    if size is None:
+        size = 512
+    content = factory.make_bytes(size=size)
+    # The content is left for the store to write, so the large file starts
+    # out empty but expecting `content`.
+    largefile = factory.make_LargeFile(
+        content=b"", size=size, sha256=hashlib.sha256(content).hexdigest()
+    )
     resource = factory.make_usable_boot_resource(
-        rtype=BOOT_RESOURCE_TYPE.SYNCED, size=size
+        rtype=BOOT_RESOURCE_TYPE.SYNCED, largefile=largefile
     )
-    rfile = resource.sets.first().files.first()
-    with rfile.largefile.content.open("rb") as stream:
-        content = stream.read()
-    with rfile.largefile.content.open("wb") as stream:
-        stream.truncate()
+    rfile = get_first_resource_file(resource)
     return rfile, BytesIO(content), content
 
 
@@ -166,6 +185,11 @@ class TestSimpleStreamsHandler(MAASServerTestCase):
     def get_stream_client(self, filename):
         return self.client.get(self.reverse_stream_handler(filename))
 
+    def get_stream_json(self, filename):
+        response = self.get_stream_client(filename)
+        self.assertEqual(http.client.OK, response.status_code)
+        return json_load_bytes(response.content)
+
     def get_file_client(self, os, arch, subarch, series, version, filename):
         return self.client.get(
             self.reverse_file_handler(
@@ -183,131 +207,121 @@ class TestSimpleStreamsHandler(MAASServerTestCase):
         return "maas:boot:%s:%s:%s:%s" % (os, arch, subarch, series)
 
     def make_usable_product_boot_resource(
-        self, kflavor=None, bootloader_type=None, rolling=False
+        self, kflavor=None, bootloader_type=None, rolling=False, largefile=None
     ):
         resource = factory.make_usable_boot_resource(
-            kflavor=kflavor, bootloader_type=bootloader_type, rolling=rolling
+            kflavor=kflavor,
+            bootloader_type=bootloader_type,
+            rolling=rolling,
+            largefile=largefile,
         )
         return self.get_product_name_for_resource(resource), resource
 
     def test_streams_other_than_allowed_returns_404(self):
-        allowed_paths = ["index.json", "maas:v2:download.json"]
+        # The allowed paths, index.json and maas:v2:download.json, are
+        # fetched successfully by the get_stream_json() tests below.
         invalid_paths = [
             "%s.json" % factory.make_name("path") for _ in range(3)
         ]
-        for path in allowed_paths:
-            response = self.get_stream_client(path)
-            self.assertEqual(http.client.OK, response.status_code)
         for path in invalid_paths:
             response = self.get_stream_client(path)
             self.assertEqual(http.client.NOT_FOUND, response.status_code)
 
-    def test_streams_product_index_contains_keys(self):
-        response = self.get_stream_client("index.json")
-        output = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
+    def test_streams_product_index_describes_maas_v2_download(self):
+        # Without any resources the index's shape is fixed, so check it all
+        # against a single fetch.
+        output = self.get_stream_json("index.json")
         self.assertThat(output, ContainsAll(["index", "updated", "format"]))
-
-    def test_streams_product_index_format_is_index_1(self):
-        response = self.get_stream_client("index.json")
-        output = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
         self.assertEqual("index:1.0", output["format"])
-
-    def test_streams_product_index_index_has_maas_v2_download(self):
-        response = self.get_stream_client("index.json")
-        output = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
         self.assertThat(output["index"], ContainsAll(["maas:v2:download"]))
-
-    def test_streams_product_index_maas_v2_download_contains_keys(self):
-        response = self.get_stream_client("index.json")
-        output = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
+        download = output["index"]["maas:v2:download"]
         self.assertThat(
-            output["index"]["maas:v2:download"],
+            download,
             ContainsAll(["datatype", "path", "updated", "products", "format"]),
         )
-
-    def test_streams_product_index_maas_v2_download_has_valid_values(self):
-        response = self.get_stream_client("index.json")
-        output = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
-        self.assertEqual(
-            "image-downloads", output["index"]["maas:v2:download"]["datatype"]
-        )
-        self.assertEqual(
-            "streams/v1/maas:v2:download.json",
-            output["index"]["maas:v2:download"]["path"],
-        )
-        self.assertEqual(
-            "products:1.0", output["index"]["maas:v2:download"]["format"]
-        )
-
-    def test_streams_product_index_empty_products(self):
-        response = self.get_stream_client("index.json")
-        output = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
-        self.assertEqual([], output["index"]["maas:v2:download"]["products"])
+        self.assertEqual("image-downloads", download["datatype"])
+        self.assertEqual("streams/v1/maas:v2:download.json", download["path"])
+        self.assertEqual("products:1.0", download["format"])
+        self.assertEqual([], download["products"])
 
     def test_streams_product_index_empty_with_incomplete_resource(self):
         resource = factory.make_BootResource()
         factory.make_BootResourceSet(resource)
-        response = self.get_stream_client("index.json")
-        output = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
+        output = self.get_stream_json("index.json")
         self.assertEqual([], output["index"]["maas:v2:download"]["products"])
 
     def test_streams_product_index_with_resources(self):
+        # Only the product names matter, so the files can share content.
+        largefile = factory.make_LargeFile()
         products = []
         for _ in range(3):
-            product, _ = self.make_usable_product_boot_resource()
+            product, _ = self.make_usable_product_boot_resource(
+                largefile=largefile
+            )
             products.append(product)
-        response = self.get_stream_client("index.json")
-        output = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
+        output = self.get_stream_json("index.json")
         # Product listing should be the same as all of the completed
         # boot resources in the database.
-        self.assertItemsEqual(
-            products, output["index"]["maas:v2:download"]["products"]
+        self.assertEqual(
+            sorted(products),
+            sorted(output["index"]["maas:v2:download"]["products"]),
         )
 
-    def test_streams_product_download_contains_keys(self):
-        response = self.get_stream_client("maas:v2:download.json")
-        output = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
+    def test_streams_product_download_describes_products(self):
+        # As for the index, the shape is fixed without any resources.
+        output = self.get_stream_json("maas:v2:download.json")
         self.assertThat(
             output,
             ContainsAll(
                 ["datatype", "updated", "content_id", "products", "format"]
             ),
         )
-
-    def test_streams_product_download_has_valid_values(self):
-        response = self.get_stream_client("maas:v2:download.json")
-        output = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
         self.assertEqual("image-downloads", output["datatype"])
         self.assertEqual("maas:v2:download", output["content_id"])
         self.assertEqual("products:1.0", output["format"])
-
-    def test_streams_product_download_empty_products(self):
-        response = self.get_stream_client("maas:v2:download.json")
-        output = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
         self.assertEqual({}, output["products"])
 
     def test_streams_product_download_empty_with_incomplete_resource(self):
         resource = factory.make_BootResource()
         factory.make_BootResourceSet(resource)
-        response = self.get_stream_client("maas:v2:download.json")
-        output = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
+        output = self.get_stream_json("maas:v2:download.json")
         self.assertEqual({}, output["products"])
 
     def test_streams_product_download_has_valid_product_keys(self):
+        # Only the product names matter, so the files can share content.
+        largefile = factory.make_LargeFile()
         products = []
         for _ in range(3):
-            product, _ = self.make_usable_product_boot_resource()
+            product, _ = self.make_usable_product_boot_resource(
+                largefile=largefile
+            )
             products.append(product)
-        response = self.get_stream_client("maas:v2:download.json")
-        output = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
+        output = self.get_stream_json("maas:v2:download.json")
         # Product listing should be the same as all of the completed
         # boot resources in the database.
         self.assertThat(output["products"], ContainsAll(products))
 
+    def test_streams_product_download_query_count_is_constant(self):
+        # The rack connectivity check would add queries of its own.
+        self.patch(
+            middleware.ExternalComponentsMiddleware,
+            "_check_rack_controller_connectivity",
+        )
+        url = self.reverse_stream_handler("maas:v2:download.json")
+        largefile = factory.make_LargeFile()
+        self.make_usable_product_boot_resource(largefile=largefile)
+        count_one, response = count_queries(self.client.get, url)
+        self.assertEqual(http.client.OK, response.status_code)
+        for _ in range(2):
+            self.make_usable_product_boot_resource(largefile=largefile)
+        count_three, response = count_queries(self.client.get, url)
+        self.assertEqual(http.client.OK, response.status_code)
+        self.assertEqual(3, len(json_load_bytes(response.content)["products"]))
+        self.assertEqual(count_one, count_three)
+
     def test_streams_product_download_product_contains_keys(self):
         product, _ = self.make_usable_product_boot_resource()
-        response = self.get_stream_client("maas:v2:download.json")
-        output = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
+        output = self.get_stream_json("maas:v2:download.json")
         self.assertThat(
             output["products"][product],
             ContainsAll(
@@ -334,8 +348,7 @@ class TestSimpleStreamsHandler(MAASServerTestCase):
         product, _ = self.make_usable_product_boot_resource(
             kflavor, bootloader_type, True
         )
-        response = self.get_stream_client("maas:v2:download.json")
-        output = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
+        output = self.get_stream_json("maas:v2:download.json")
         self.assertEquals(kflavor, output["products"][product]["kflavor"])
         self.assertEquals(
             bootloader_type, output["products"][product]["bootloader-type"]
@@ -346,8 +359,7 @@ class TestSimpleStreamsHandler(MAASServerTestCase):
         product, resource = self.make_usable_product_boot_resource()
         _, _, os, arch, subarch, series = product.split(":")
         label = resource.get_latest_complete_set().label
-        response = self.get_stream_client("maas:v2:download.json")
-        output = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
+        output = self.get_stream_json("maas:v2:download.json")
         output_product = output["products"][product]
         self.assertEqual(subarch, output_product["subarch"])
         self.assertEqual(label, output_product["label"])
@@ -364,8 +376,7 @@ class TestSimpleStreamsHandler(MAASServerTestCase):
         factory.make_BootResourceSet(resource)
         newest_set = factory.make_BootResourceSet(resource)
         factory.make_boot_resource_file_with_content(newest_set)
-        response = self.get_stream_client("maas:v2:download.json")
-        output = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
+        output = self.get_stream_json("maas:v2:download.json")
         output_product = output["products"][product]
         self.assertEqual(newest_set.label, output_product["label"])
 
@@ -374,13 +385,13 @@ class TestSimpleStreamsHandler(MAASServerTestCase):
         resource_sets = [
             factory.make_BootResourceSet(resource) for _ in range(3)
         ]
+        largefile = factory.make_LargeFile()
         versions = []
         for resource_set in resource_sets:
-            factory.make_boot_resource_file_with_content(resource_set)
+            factory.make_BootResourceFile(resource_set, largefile)
             versions.append(resource_set.version)
         product = self.get_product_name_for_resource(resource)
-        response = self.get_stream_client("maas:v2:download.json")
-        output = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
+        output = self.get_stream_json("maas:v2:download.json")
         self.assertThat(
             output["products"][product]["versions"], ContainsAll(versions)
         )
@@ -389,17 +400,15 @@ class TestSimpleStreamsHandler(MAASServerTestCase):
         product, resource = self.make_usable_product_boot_resource()
         resource_set = resource.get_latest_complete_set()
         items = [rfile.filename for rfile in resource_set.files.all()]
-        response = self.get_stream_client("maas:v2:download.json")
-        output = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
+        output = self.get_stream_json("maas:v2:download.json")
         version = output["products"][product]["versions"][resource_set.version]
         self.assertThat(version["items"], ContainsAll(items))
 
     def test_streams_product_download_product_item_contains_keys(self):
         product, resource = self.make_usable_product_boot_resource()
         resource_set = resource.get_latest_complete_set()
-        resource_file = resource_set.files.order_by("?")[0]
-        response = self.get_stream_client("maas:v2:download.json")
-        output = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
+        resource_file = random.choice(resource_set.files.all())
+        output = self.get_stream_json("maas:v2:download.json")
         version = output["products"][product]["versions"][resource_set.version]
         self.assertThat(
             version["items"][resource_file.filename],
@@ -410,7 +419,7 @@ class TestSimpleStreamsHandler(MAASServerTestCase):
         product, resource = self.make_usable_product_boot_resource()
         _, _, os, arch, subarch, series = product.split(":")
         resource_set = resource.get_latest_complete_set()
-        resource_file = resource_set.files.order_by("?")[0]
+        resource_file = random.choice(resource_set.files.all())
         path = "%s/%s/%s/%s/%s/%s" % (
             os,
             arch,
@@ -419,8 +428,7 @@ class TestSimpleStreamsHandler(MAASServerTestCase):
             resource_set.version,
             resource_file.filename,
         )
-        response = self.get_stream_client("maas:v2:download.json")
-        output = json.loads(response.content.decode(settings.DEFAULT_CHARSET))
+        output = self.get_stream_json("maas:v2:download.json")
         version = output["products"][product]["versions"][resource_set.version]
         item = version["items"][resource_file.filename]
         self.assertEqual(path, item["path"])
@@ -468,7 +476,7 @@ class TestSimpleStreamsHandler(MAASServerTestCase):
         _, _, os, arch, subarch, series = product.split(":")
         resource_set = resource.get_latest_complete_set()
         version = resource_set.version
-        resource_file = resource_set.files.order_by("?")[0]
+        resource_file = random.choice(resource_set.files.all())
         filename = resource_file.filename
         response = self.get_file_client(
             os, arch, subarch, series, version, filename
@@ -480,7 +488,7 @@ class TestSimpleStreamsHandler(MAASServerTestCase):
         _, _, os, arch, subarch, series = product.split(":")
         resource_set = resource.get_latest_complete_set()
         version = resource_set.version
-        resource_file = resource_set.files.order_by("?")[0]
+        resource_file = random.choice(resource_set.files.all())
         filename = resource_file.filename
         response = self.get_file_client(
             os, arch, subarch, series, version, filename
@@ -513,8 +521,10 @@ class TestConnectionWrapper(MAASTransactionServerTestCase):
             # cases this will always be true. The simplestreams content from
             # maas.io, is formatted this way.
             filename = filetype
-            size = randint(1024, 2048)
-            content = factory.make_bytes(size=size)
+            # Only the streaming plumbing is under test, so a few bytes of
+            # content are as good as a realistic file.
+            content = factory.make_bytes(size=64)
+            size = len(content)
             resource = factory.make_BootResource(
                 rtype=BOOT_RESOURCE_TYPE.SYNCED,
                 name=name,
@@ -555,8 +565,7 @@ class TestConnectionWrapper(MAASTransactionServerTestCase):
             bootresources.ConnectionWrapper, "_get_new_connection"
         )
 
-        client = MAASSensibleClient()
-        response = client.get(url)
+        response = self.client.get(url)
         self.read_response(response)
         self.assertThat(mock_get_new_connection, MockCalledOnceWith())
 
@@ -581,8 +590,7 @@ class TestConnectionWrapper(MAASTransactionServerTestCase):
 
         self.patch(bootresources, "ConnectionWrapper", AssertConnectionWrapper)
 
-        client = MAASSensibleClient()
-        response = client.get(url)
+        response = self.client.get(url)
         self.read_response(response)
 
         # Add cleanup to close the connection, since this was removed from
@@ -707,8 +715,11 @@ class TestBootResourceStore(MAASServerTestCase):
 
     def test_init_initializes_variables(self):
         _, resource_names = self.make_boot_resources()
-        store = BootResourceStore()
-        self.assertItemsEqual(resource_names, store._resources_to_delete)
+        count, store = count_queries(BootResourceStore)
+        self.assertEqual(1, count)
+        self.assertEqual(
+            sorted(resource_names), sorted(store._resources_to_delete)
+        )
         self.assertEqual({}, store._content_to_finalize)
 
     def test_prevent_resource_deletion_removes_resource(self):
@@ -717,14 +728,18 @@ class TestBootResourceStore(MAASServerTestCase):
         resource = resources.pop()
         resource_names.pop()
         store.prevent_resource_deletion(resource)
-        self.assertItemsEqual(resource_names, store._resources_to_delete)
+        self.assertEqual(
+            sorted(resource_names), sorted(store._resources_to_delete)
+        )
 
     def test_prevent_resource_deletion_doesnt_remove_unknown_resource(self):
         resources, resource_names = self.make_boot_resources()
         store = BootResourceStore()
         resource = factory.make_BootResource(rtype=BOOT_RESOURCE_TYPE.SYNCED)
         store.prevent_resource_deletion(resource)
-        self.assertItemsEqual(resource_names, store._resources_to_delete)
+        self.assertEqual(
+            sorted(resource_names), sorted(store._resources_to_delete)
+        )
 
     def test_save_content_later_adds_to__content_to_finalize_var(self):
         _, _, rfile = make_boot_resource_group()
@@ -957,14 +972,10 @@ class TestBootResourceStore(MAASServerTestCase):
             resource_set, filename=filename
         )
         store = BootResourceStore()
+        ident = "/".join((os, arch, subarch, series, version, filename))
+        self.assertEqual(ident, store.get_resource_file_log_identifier(rfile))
         self.assertEqual(
-            "%s/%s/%s/%s/%s/%s"
-            % (os, arch, subarch, series, version, filename),
-            store.get_resource_file_log_identifier(rfile),
-        )
-        self.assertEqual(
-            "%s/%s/%s/%s/%s/%s"
-            % (os, arch, subarch, series, version, filename),
+            ident,
             store.get_resource_file_log_identifier(
                 rfile, resource_set, resource
             ),
@@ -973,29 +984,34 @@ class TestBootResourceStore(MAASServerTestCase):
     def test_write_content_thread_saves_data(self):
         store = BootResourceStore()
         # Make size bigger than the read size so multiple loops are performed
-        # and the content is written correctly.
+        # and the content is written correctly. A small read size keeps the
+        # content small.
+        store.read_size = 1024
         size = int(2.5 * store.read_size)
         rfile, reader, content = make_boot_resource_file_with_stream(size=size)
         store.write_content_thread(rfile.id, reader)
-        self.assertTrue(BootResourceFile.objects.filter(id=rfile.id).exists())
+        rfile = BootResourceFile.objects.select_related("largefile").get(
+            id=rfile.id
+        )
         with rfile.largefile.content.open("rb") as stream:
             written_data = stream.read()
         self.assertEqual(content, written_data)
-        rfile.largefile = reload_object(rfile.largefile)
         self.assertEqual(rfile.largefile.size, len(written_data))
         self.assertEqual(rfile.largefile.size, rfile.largefile.total_size)
 
     def test_write_content_doesnt_write_if_cancel(self):
         store = BootResourceStore()
+        store.read_size = 1024
         size = int(2.5 * store.read_size)
         rfile, reader, content = make_boot_resource_file_with_stream(size=size)
         store._cancel_finalize = True
         store.write_content_thread(rfile.id, reader)
-        self.assertTrue(BootResourceFile.objects.filter(id=rfile.id).exists())
+        rfile = BootResourceFile.objects.select_related("largefile").get(
+            id=rfile.id
+        )
         with rfile.largefile.content.open("rb") as stream:
             written_data = stream.read()
         self.assertEqual(b"", written_data)
-        rfile.largefile = reload_object(rfile.largefile)
         self.assertEqual(rfile.largefile.size, 0)
 
     @skip(
@@ -1096,26 +1112,82 @@ class TestBootResourceStore(MAASServerTestCase):
         self.expectThat(mock_delete, MockCalledOnceWith())
         self.expectThat(mock_resource_set_cleaner, MockCalledOnceWith())
 
-
-class TestBootResourceTransactional(MAASTransactionServerTestCase):
-    """Test methods on `BootResourceStore` that manage their own transactions.
-
-    This is done using `MAASTransactionServerTestCase` so the database is
-    flushed after each test run.
-    """
-
     def test_insert_does_nothing_if_file_already_exists(self):
         name, architecture, product = make_product()
-        with transaction.atomic():
-            product, resource = make_boot_resource_group_from_product(product)
-            rfile = resource.sets.first().files.first()
+        product, resource = make_boot_resource_group_from_product(product)
+        rfile = get_first_resource_file(resource)
         largefile = rfile.largefile
         store = BootResourceStore()
         mock_save_later = self.patch(store, "save_content_later")
         store.insert(product, sentinel.reader)
-        self.assertEqual(largefile, reload_object(rfile).largefile)
+        self.assertEqual(largefile.id, reload_object(rfile).largefile_id)
         self.assertThat(mock_save_later, MockNotCalled())
 
+    def test_insert_creates_new_largefile(self):
+        name, architecture, product = make_product()
+        resource = factory.make_BootResource(
+            rtype=BOOT_RESOURCE_TYPE.SYNCED,
+            name=name,
+            architecture=architecture,
+        )
+        resource_set = factory.make_BootResourceSet(
+            resource, version=product["version_name"]
+        )
+        product["sha256"] = factory.make_string(size=64)
+        product["size"] = randint(1024, 2048)
+        store = BootResourceStore()
+        mock_save_later = self.patch(store, "save_content_later")
+        store.insert(product, sentinel.reader)
+        rfile = get_one(reload_object(resource_set).files.all())
+        self.assertEqual(product["sha256"], rfile.largefile.sha256)
+        self.assertEqual(product["size"], rfile.largefile.total_size)
+        self.assertThat(
+            mock_save_later, MockCalledOnceWith(rfile, sentinel.reader)
+        )
+
+    def test_insert_doesnt_print_error_when_first_import(self):
+        name, architecture, product = make_product()
+        factory.make_BootResource(
+            rtype=BOOT_RESOURCE_TYPE.SYNCED,
+            name=name,
+            architecture=architecture,
+        )
+        product["sha256"] = factory.make_string(size=64)
+        product["size"] = randint(1024, 2048)
+        store = BootResourceStore()
+
+        with FakeLogger("maas", logging.ERROR) as logger:
+            store.insert(product, sentinel.reader)
+
+        self.assertEqual("", logger.output)
+
+    def test_resource_cleaner_removes_boot_resources_without_sets(self):
+        resources = [
+            factory.make_BootResource(rtype=BOOT_RESOURCE_TYPE.SYNCED)
+            for _ in range(3)
+        ]
+        store = BootResourceStore()
+        store.resource_cleaner()
+        self.assertFalse(
+            BootResource.objects.filter(
+                id__in=[resource.id for resource in resources]
+            ).exists()
+        )
+
+    def test_resource_set_cleaner_removes_resources_with_empty_sets(self):
+        resource = factory.make_BootResource(rtype=BOOT_RESOURCE_TYPE.SYNCED)
+        store = BootResourceStore()
+        store.resource_set_cleaner()
+        self.assertFalse(BootResource.objects.filter(id=resource.id).exists())
+
+
+class TestBootResourceTransactional(MAASTransactionServerTestCase):
+    """Test methods on `BootResourceStore` that manage their own transactions.
+
+    This is done using `MAASTransactionServerTestCase` so the database is
+    flushed after each test run.
+    """
+
     def test_insert_uses_already_existing_largefile(self):
         name, architecture, product = make_product()
         with transaction.atomic():
@@ -1141,7 +1213,7 @@ class TestBootResourceTransactional(MAASTransactionServerTestCase):
         name, architecture, product = make_product()
         with transaction.atomic():
             product, resource = make_boot_resource_group_from_product(product)
-            rfile = resource.sets.first().files.first()
+            rfile = get_first_resource_file(resource)
             delete_largefile = rfile.largefile
             largefile = factory.make_LargeFile()
         product["sha256"] = largefile.sha256
@@ -1152,7 +1224,7 @@ class TestBootResourceTransactional(MAASTransactionServerTestCase):
         self.assertFalse(
             LargeFile.objects.filter(id=delete_largefile.id).exists()
         )
-        self.assertEqual(largefile, reload_object(rfile).largefile)
+        self.assertEqual(largefile.id, reload_object(rfile).largefile_id)
         self.assertThat(mock_save_later, MockNotCalled())
 
     def test_insert_deletes_root_image_if_squashfs_available(self):
@@ -1232,41 +1304,18 @@ class TestBootResourceTransactional(MAASTransactionServerTestCase):
         store = BootResourceStore()
         mock_save_later = self.patch(store, "save_content_later")
         store.insert(product, sentinel.reader)
-        self.assertEqual(largefile, reload_object(rfile).largefile)
-        self.assertTrue(
-            LargeFile.objects.filter(id=other_file.largefile.id).exists()
-        )
-        self.assertTrue(
-            BootResourceFile.objects.filter(id=other_file.id).exists()
-        )
+        # largefile is a non-null foreign key, so the other file still
+        # pointing at its large file shows that large file was kept.
         self.assertEqual(
-            other_file.largefile, reload_object(other_file).largefile
+            {rfile.id: largefile.id, other_file.id: other_file.largefile_id},
+            dict(
+                BootResourceFile.objects.filter(
+                    id__in=[rfile.id, other_file.id]
+                ).values_list("id", "largefile_id")
+            ),
         )
         self.assertThat(mock_save_later, MockNotCalled())
 
-    def test_insert_creates_new_largefile(self):
-        name, architecture, product = make_product()
-        with transaction.atomic():
-            resource = factory.make_BootResource(
-                rtype=BOOT_RESOURCE_TYPE.SYNCED,
-                name=name,
-                architecture=architecture,
-            )
-            resource_set = factory.make_BootResourceSet(
-                resource, version=product["version_name"]
-            )
-        product["sha256"] = factory.make_string(size=64)
-        product["size"] = randint(1024, 2048)
-        store = BootResourceStore()
-        mock_save_later = self.patch(store, "save_content_later")
-        store.insert(product, sentinel.reader)
-        rfile = get_one(reload_object(resource_set).files.all())
-        self.assertEqual(product["sha256"], rfile.largefile.sha256)
-        self.assertEqual(product["size"], rfile.largefile.total_size)
-        self.assertThat(
-            mock_save_later, MockCalledOnceWith(rfile, sentinel.reader)
-        )
-
     def test_insert_prints_error_when_breaking_resources(self):
         # Test case for bug 1419041: if the call to insert() makes
         # an existing complete resource incomplete: print an error in the
@@ -1310,40 +1359,6 @@ class TestBootResourceTransactional(MAASTransactionServerTestCase):
             logger.output,
         )
 
-    def test_insert_doesnt_print_error_when_first_import(self):
-        name, architecture, product = make_product()
-        with transaction.atomic():
-            factory.make_BootResource(
-                rtype=BOOT_RESOURCE_TYPE.SYNCED,
-                name=name,
-                architecture=architecture,
-            )
-        product["sha256"] = factory.make_string(size=64)
-        product["size"] = randint(1024, 2048)
-        store = BootResourceStore()
-
-        with FakeLogger("maas", logging.ERROR) as logger:
-            store.insert(product, sentinel.reader)
-
-        self.assertEqual("", logger.output)
-
-    def test_resource_cleaner_removes_boot_resources_without_sets(self):
-        with transaction.atomic():
-            resources = [
-                factory.make_BootResource(rtype=BOOT_RESOURCE_TYPE.SYNCED)
-                for _ in range(3)
-            ]
-        store = BootResourceStore()
-        store.resource_cleaner()
-        for resource in resources:
-            os, series = resource.name.split("/")
-            arch, subarch = resource.split_arch()
-            self.assertFalse(
-                BootResource.objects.has_synced_resource(
-                    os, arch, subarch, series
-                )
-            )
-
     def test_resource_cleaner_removes_boot_resources_not_in_selections(self):
         self.useFixture(SignalsDisabled("bootsources"))
         self.useFixture(SignalsDisabled("largefiles"))
@@ -1351,22 +1366,22 @@ class TestBootResourceTransactional(MAASTransactionServerTestCase):
             # Make random selection as one is required, and empty set of
             # selections will not delete anything.
             factory.make_BootSourceSelection()
+            # Only the resources' identities matter, so the files can
+            # share content.
+            largefile = factory.make_LargeFile()
             resources = [
                 factory.make_usable_boot_resource(
-                    rtype=BOOT_RESOURCE_TYPE.SYNCED
+                    rtype=BOOT_RESOURCE_TYPE.SYNCED, largefile=largefile
                 )
                 for _ in range(3)
             ]
         store = BootResourceStore()
         store.resource_cleaner()
-        for resource in resources:
-            os, series = resource.name.split("/")
-            arch, subarch = resource.split_arch()
-            self.assertFalse(
-                BootResource.objects.has_synced_resource(
-                    os, arch, subarch, series
-                )
-            )
+        self.assertFalse(
+            BootResource.objects.filter(
+                id__in=[resource.id for resource in resources]
+            ).exists()
+        )
 
     def test_resource_cleaner_removes_extra_subarch_boot_resource(self):
         self.useFixture(SignalsDisabled("bootsources"))
@@ -1412,9 +1427,10 @@ class TestBootResourceTransactional(MAASTransactionServerTestCase):
         self.patch(bootresources.Event.objects, "create_region_event")
         self.useFixture(SignalsDisabled("bootsources"))
         with transaction.atomic():
+            largefile = factory.make_LargeFile()
             resources = [
                 factory.make_usable_boot_resource(
-                    rtype=BOOT_RESOURCE_TYPE.SYNCED
+                    rtype=BOOT_RESOURCE_TYPE.SYNCED, largefile=largefile
                 )
                 for _ in range(3)
             ]
@@ -1431,14 +1447,12 @@ class TestBootResourceTransactional(MAASTransactionServerTestCase):
                 )
         store = BootResourceStore()
         store.resource_cleaner()
-        for resource in resources:
-            os, series = resource.name.split("/")
-            arch, subarch = resource.split_arch()
-            self.assertTrue(
-                BootResource.objects.has_synced_resource(
-                    os, arch, subarch, series
-                )
-            )
+        self.assertEqual(
+            len(resources),
+            BootResource.objects.filter(
+                id__in=[resource.id for resource in resources]
+            ).count(),
+        )
 
     def test_resource_set_cleaner_removes_incomplete_set(self):
         with transaction.atomic():
@@ -1458,29 +1472,22 @@ class TestBootResourceTransactional(MAASTransactionServerTestCase):
             resource = factory.make_BootResource(
                 rtype=BOOT_RESOURCE_TYPE.SYNCED
             )
+            largefile = factory.make_LargeFile()
             old_complete_sets = []
             for _ in range(3):
                 resource_set = factory.make_BootResourceSet(resource)
-                factory.make_boot_resource_file_with_content(resource_set)
+                factory.make_BootResourceFile(resource_set, largefile)
                 old_complete_sets.append(resource_set)
             newest_set = factory.make_BootResourceSet(resource)
-            factory.make_boot_resource_file_with_content(newest_set)
+            factory.make_BootResourceFile(newest_set, largefile)
         store = BootResourceStore()
         store.resource_set_cleaner()
         self.assertItemsEqual([newest_set], resource.sets.all())
-        for resource_set in old_complete_sets:
-            self.assertFalse(
-                BootResourceSet.objects.filter(id=resource_set.id).exists()
-            )
-
-    def test_resource_set_cleaner_removes_resources_with_empty_sets(self):
-        with transaction.atomic():
-            resource = factory.make_BootResource(
-                rtype=BOOT_RESOURCE_TYPE.SYNCED
-            )
-        store = BootResourceStore()
-        store.resource_set_cleaner()
-        self.assertFalse(BootResource.objects.filter(id=resource.id).exists())
+        self.assertFalse(
+            BootResourceSet.objects.filter(
+                id__in=[resource_set.id for resource_set in old_complete_sets]
+            ).exists()
+        )
 
     def test_perform_writes_writes_all_content(self):
         with transaction.atomic():
@@ -1490,10 +1497,13 @@ class TestBootResourceTransactional(MAASTransactionServerTestCase):
                 store.save_content_later(rfile, reader)
         store.perform_write()
         with transaction.atomic():
+            self.assertEqual(
+                len(files),
+                BootResourceFile.objects.filter(
+                    id__in=[rfile.id for rfile, _, _ in files]
+                ).count(),
+            )
             for rfile, reader, content in files:
-                self.assertTrue(
-                    BootResourceFile.objects.filter(id=rfile.id).exists()
-                )
                 with rfile.largefile.content.open("rb") as stream:
                     written_data = stream.read()
                 self.assertEqual(content, written_data)
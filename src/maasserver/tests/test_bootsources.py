@@ -12,7 +12,6 @@ from unittest import skip
 from unittest.mock import ANY, MagicMock
 
 from requests.exceptions import ConnectionError
-from testtools.matchers import HasLength
 
 from maasserver import bootsources
 from maasserver.bootsources import (
@@ -116,29 +115,31 @@ class TestHelpers(MAASServerTestCase):
             "Should have returned True signaling that the "
             "sources where added.",
         )
-        sources = BootSource.objects.all()
-        self.assertThat(sources, HasLength(1))
-        [source] = sources
-        self.assertAttributes(
-            source,
-            {
-                "url": DEFAULT_IMAGES_URL,
-                "keyring_filename": (
-                    "/usr/share/keyrings/ubuntu-cloudimage-keyring.gpg"
-                ),
-            },
+        self.assertEqual(
+            [
+                {
+                    "url": DEFAULT_IMAGES_URL,
+                    "keyring_filename": (
+                        "/usr/share/keyrings/ubuntu-cloudimage-keyring.gpg"
+                    ),
+                }
+            ],
+            list(BootSource.objects.values("url", "keyring_filename")),
         )
-        selections = BootSourceSelection.objects.filter(boot_source=source)
-        by_release = {selection.release: selection for selection in selections}
-        self.assertItemsEqual(["bionic"], by_release.keys())
-        self.assertAttributes(
-            by_release["bionic"],
-            {
-                "release": "bionic",
-                "arches": [arch, "amd64"],
-                "subarches": ["*"],
-                "labels": ["*"],
-            },
+        self.assertEqual(
+            [
+                {
+                    "release": "bionic",
+                    "arches": [arch, "amd64"],
+                    "subarches": ["*"],
+                    "labels": ["*"],
+                }
+            ],
+            list(
+                BootSourceSelection.objects.values(
+                    "release", "arches", "subarches", "labels"
+                )
+            ),
         )
 
     def test_ensure_boot_source_definition_creates_with_default_arch(self):
@@ -151,29 +152,31 @@ class TestHelpers(MAASServerTestCase):
             "Should have returned True signaling that the "
             "sources where added.",
         )
-        sources = BootSource.objects.all()
-        self.assertThat(sources, HasLength(1))
-        [source] = sources
-        self.assertAttributes(
-            source,
-            {
-                "url": DEFAULT_IMAGES_URL,
-                "keyring_filename": (
-                    "/usr/share/keyrings/ubuntu-cloudimage-keyring.gpg"
-                ),
-            },
+        self.assertEqual(
+            [
+                {
+                    "url": DEFAULT_IMAGES_URL,
+                    "keyring_filename": (
+                        "/usr/share/keyrings/ubuntu-cloudimage-keyring.gpg"
+                    ),
+                }
+            ],
+            list(BootSource.objects.values("url", "keyring_filename")),
         )
-        selections = BootSourceSelection.objects.filter(boot_source=source)
-        by_release = {selection.release: selection for selection in selections}
-        self.assertItemsEqual(["bionic"], by_release.keys())
-        self.assertAttributes(
-            by_release["bionic"],
-            {
-                "release": "bionic",
-                "arches": ["amd64"],
-                "subarches": ["*"],
-                "labels": ["*"],
-            },
+        self.assertEqual(
+            [
+                {
+                    "release": "bionic",
+                    "arches": ["amd64"],
+                    "subarches": ["*"],
+                    "labels": ["*"],
+                }
+            ],
+            list(
+                BootSourceSelection.objects.values(
+                    "release", "arches", "subarches", "labels"
+                )
+            ),
         )
 
     def test_ensure_boot_source_definition_skips_if_already_present(self):
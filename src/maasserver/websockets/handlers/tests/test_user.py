@@ -20,7 +20,6 @@ from maasserver.permissions import (
 from maasserver.testing.factory import factory
 from maasserver.testing.fixtures import RBACForceOffFixture
 from maasserver.testing.testcase import MAASServerTestCase
-from maasserver.utils.orm import reload_object
 from maasserver.websockets.base import (
     DATETIME_FORMAT,
     dehydrate_datetime,
@@ -289,9 +288,8 @@ class TestUserHandler(MAASServerTestCase):
         )
 
         handler.update(params)
-        self.assertAttributes(
-            reload_object(user), subset_dict(params, user_attributes)
-        )
+        user.refresh_from_db(fields=user_attributes)
+        self.assertAttributes(user, subset_dict(params, user_attributes))
 
     def test_update_other_as_admin(self):
         admin_user = factory.make_admin()
@@ -310,9 +308,8 @@ class TestUserHandler(MAASServerTestCase):
 
         handler.update(params)
 
-        self.assertAttributes(
-            reload_object(user), subset_dict(params, user_attributes)
-        )
+        user.refresh_from_db(fields=user_attributes)
+        self.assertAttributes(user, subset_dict(params, user_attributes))
 
     def test_update_as_admin_event_log(self):
         admin_user = factory.make_admin()
@@ -7,8 +7,7 @@ __all__ = ["count_queries", "DjangoTestCase", "DjangoTransactionTestCase"]
 
 from time import sleep, time
 
-from django.core.signals import request_started
-from django.db import connection, connections, DEFAULT_DB_ALIAS, reset_queries
+from django.db import connection, connections, DEFAULT_DB_ALIAS
 from django.http.response import HttpResponseBase
 import django.test
 
@@ -48,6 +47,9 @@ HttpResponseBase.__init__ = patched_HttpResponseBase__init__
 class CountQueries:
     """Context manager: count number of database queries issued in context.
 
+    This installs itself as an execute wrapper on the connection, so it only
+    counts queries; it does not keep their SQL around.
+
     :ivar num_queries: The number of database queries that were performed while
         this context was active.
     """
@@ -56,20 +58,19 @@ class CountQueries:
         self.connection = connections[DEFAULT_DB_ALIAS]
         self.num_queries = 0
 
+    def __call__(self, execute, sql, params, many, context):
+        """Execute wrapper: count the query, then execute it."""
+        self.num_queries += 1
+        return execute(sql, params, many, context)
+
     def __enter__(self):
-        self.force_debug_cursor = self.connection.force_debug_cursor
-        self.connection.force_debug_cursor = True
-        self.starting_count = len(self.connection.queries)
-        request_started.disconnect(reset_queries)
+        self.num_queries = 0
+        self.execute_wrapper = self.connection.execute_wrapper(self)
+        self.execute_wrapper.__enter__()
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        self.connection.force_debug_cursor = self.force_debug_cursor
-        request_started.connect(reset_queries)
-        if exc_type is not None:
-            return
-        final_count = len(self.connection.queries)
-        self.num_queries = final_count - self.starting_count
+        self.execute_wrapper.__exit__(exc_type, exc_value, traceback)
 
 
 def count_queries(func, *args, **kwargs):
@@ -55,10 +55,9 @@ class TestBcd(MAASTestCase):
         self.configure_hivex()
         filename = factory.make_name("filename")
         bcd = Bcd(filename)
-        bcd.uids = mock.MagicMock(spec=dict)
         if uids is None:
             uids = [factory.make_name("uid"), factory.make_name("uid")]
-        bcd.uids.__getitem__.return_value = uids
+        bcd.uids = {bcd.loader: uids}
         bcd.hive = mock.MagicMock()
         return bcd
 
@@ -66,8 +65,7 @@ class TestBcd(MAASTestCase):
         bcd = self.configure_bcd()
 
         mock_elem = factory.make_name("elem")
-        bootmgr_elems = mock.MagicMock(spec=dict)
-        bootmgr_elems.__getitem__.return_value = mock_elem
+        bootmgr_elems = {bcd.BOOT_MGR_DISPLAY_ORDER: mock_elem}
 
         mock_node_value = factory.make_name("node_value")
         bcd.hive.node_values.return_value = [mock_node_value]
@@ -119,7 +117,7 @@ class TestBcd(MAASTestCase):
         mock_uid_1 = factory.make_name("uid")
         bcd = self.configure_bcd(uids=[mock_uid_0, mock_uid_1])
 
-        fake_value = factory.make_name("value").encode("ascii")
+        fake_value = factory.make_name("value")
         mock_get_load_options_key = self.patch(Bcd, "_get_load_options_key")
         mock_get_load_options_key.return_value = None
 
@@ -130,7 +128,7 @@ class TestBcd(MAASTestCase):
         compare = {
             "t": 1,
             "key": "Element",
-            "value": fake_value.decode("utf-8").encode("utf-16le"),
+            "value": fake_value.encode("utf-16le"),
         }
         self.assertThat(mock_get_load_options_key, MockCalledOnceWith())
         self.assertThat(
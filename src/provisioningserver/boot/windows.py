@@ -176,7 +176,7 @@ class Bcd:
             "t": k_type,
             "key": key,
             # Windows only accepts utf-16le in load options.
-            "value": value.decode("utf-8").encode("utf-16le"),
+            "value": value.encode("utf-16le"),
         }
         self.hive.node_set_value(h, data)
         self.hive.commit(None)
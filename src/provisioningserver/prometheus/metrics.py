@@ -3,6 +3,8 @@
 
 """Prometheus metrics."""
 
+from functools import lru_cache
+
 from provisioningserver.prometheus.collectors import (
     node_metrics_definitions,
     update_cpu_metrics,
@@ -106,10 +108,20 @@ def set_global_labels(**labels):
     GLOBAL_LABELS.update(labels)
 
 
+@lru_cache(maxsize=1)
+def get_host_ip():
+    """Return the default gateway IP for the machine, looked up once.
+
+    This is used as the "host" label on every metric update, so it's cached
+    rather than queried from the kernel each time.
+    """
+    return get_machine_default_gateway_ip()
+
+
 PROMETHEUS_METRICS = create_metrics(
     METRICS_DEFINITIONS,
     extra_labels={
-        "host": get_machine_default_gateway_ip,
+        "host": get_host_ip,
         "maas_id": lambda: GLOBAL_LABELS["maas_uuid"],
     },
     update_handlers=[update_cpu_metrics, update_memory_metrics],
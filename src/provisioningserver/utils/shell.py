@@ -12,6 +12,7 @@ __all__ = [
 
 import os
 from pipes import quote
+from shutil import which
 from string import printable
 from subprocess import CalledProcessError, PIPE, Popen
 
@@ -115,11 +116,7 @@ def call_and_check(command, *args, **kwargs):
 
 def has_command_available(command):
     """Return True if `command` is available on the system."""
-    try:
-        call_and_check(["which", command])
-    except ExternalProcessError:
-        return False
-    return True
+    return which(command) is not None
 
 
 def get_env_with_locale(environ=os.environ, locale="C.UTF-8"):
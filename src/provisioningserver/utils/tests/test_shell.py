@@ -181,22 +181,19 @@ class TestExternalProcessError(MAASTestCase):
 
 class TestHasCommandAvailable(MAASTestCase):
     def test__calls_which(self):
-        mock_call_and_check = self.patch(shell_module, "call_and_check")
+        mock_which = self.patch(shell_module, "which")
         cmd = factory.make_name("cmd")
         has_command_available(cmd)
-        self.assertThat(
-            mock_call_and_check, MockCalledOnceWith(["which", cmd])
-        )
+        self.assertThat(mock_which, MockCalledOnceWith(cmd))
 
-    def test__returns_False_when_ExternalProcessError_raised(self):
-        self.patch(
-            shell_module, "call_and_check"
-        ).side_effect = ExternalProcessError(1, "cmd")
+    def test__returns_False_when_which_returns_None(self):
+        self.patch(shell_module, "which").return_value = None
         self.assertFalse(has_command_available(factory.make_name("cmd")))
 
-    def test__returns_True_when_ExternalProcessError_not_raised(self):
-        self.patch(shell_module, "call_and_check")
-        self.assertTrue(has_command_available(factory.make_name("cmd")))
+    def test__returns_True_when_which_returns_path(self):
+        cmd = factory.make_name("cmd")
+        self.patch(shell_module, "which").return_value = "/usr/bin/" + cmd
+        self.assertTrue(has_command_available(cmd))
 
 
 # Taken from locale(7).